@@ -181,6 +181,18 @@ if __name__ == "__main__":
         default=0.8,
         help="Train to test ratio. Default: 0.8",
     )
+    parser.add_argument(
+        "--checkpoint_interval",
+        type=int,
+        default=500,
+        help="Number of images between checkpoints during txt to json conversion. "
+        "0 or less disables checkpointing. Default: 500",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume txt to json conversion from the last checkpoint in the output directory",
+    )
 
     args = parser.parse_args()
 
@@ -200,6 +212,8 @@ if __name__ == "__main__":
             image_format=args.image_format,
             output_dir=args.output_dir,
             occurences=occurences,
-            test_train_ratio=args.train_ratio,
+            train_ratio=args.train_ratio,
+            checkpoint_interval=args.checkpoint_interval,
+            resume=args.resume,
         )
         txt2json.generate_json()
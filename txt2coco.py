@@ -24,27 +24,93 @@ SOFTWARE.
 FUNCTION: to convert TEXT format annotations to COCO JSON
 INPUT TEXT FORMAT: <category name> <xmin> <ymin> <xmax> <ymax>
 OUTPUT FORMAT: COCO styled json (for reference see MS COCO website)
+CHECKPOINTS: progress is periodically saved to the output directory and a
+             run can be continued with resume=True (--resume)
 ***************************************************************************
 https://cocodataset.org/#format-data
 """
 import os
+import glob
 import json
 import random
+import hashlib
 from tqdm import tqdm
 import cv2
-from utils import _check_annotation_
+from utils import _check_annotation_, _atomic_write_
 
 
 class TXT2JSON:
-    def __init__(self, root_dir, image_format, output_dir, occurences, train_ratio):
+    def __init__(
+        self,
+        root_dir,
+        image_format,
+        output_dir,
+        occurences,
+        train_ratio,
+        checkpoint_interval=500,
+        resume=False,
+    ):
         self.root_dir = root_dir
         self.image_format = image_format
         self.output_dir = output_dir
         self.occurences = occurences
         self.train_ratio = train_ratio
+        # an interval of 0 or less disables checkpointing
+        self.checkpoint_interval = checkpoint_interval if checkpoint_interval > 0 else None
+        self.resume = resume
         print("---Converting TXT files to JSON files---")
 
-    def convert_txt2coco(self, image_filelist):
+    def _checkpoint_file(self, split_name, segment=None):
+        if segment is None:
+            return os.path.join(self.output_dir, "checkpoint_{0}.json".format(split_name))
+        return os.path.join(
+            self.output_dir, "checkpoint_{0}_{1:05d}.json".format(split_name, segment)
+        )
+
+    def _remove_checkpoint(self, split_name):
+        for checkpoint_file in glob.glob(
+            os.path.join(self.output_dir, "checkpoint_{0}*".format(split_name))
+        ):
+            os.remove(checkpoint_file)
+
+    def _load_checkpoint(self, split_name, fingerprint):
+        """
+        Load the saved state and the partial output of a previous run
+        :return: (cursor, image_id, id1, num_segments, images, annotations) or None
+        """
+        checkpoint_file = self._checkpoint_file(split_name)
+        if not os.path.exists(checkpoint_file):
+            print("[INFO] No checkpoint found for {0}..".format(split_name))
+            return None
+        with open(checkpoint_file, "r") as state_file:
+            state = json.load(state_file)
+        if state["fingerprint"] != fingerprint:
+            print(
+                "[INFO] Checkpoint for {0} does not match the dataset. "
+                "Starting from scratch..".format(split_name)
+            )
+            return None
+
+        images = list()
+        annotations = list()
+        for segment in range(state["num_segments"]):
+            with open(self._checkpoint_file(split_name, segment), "r") as seg_file:
+                seg_data = json.load(seg_file)
+            images.extend(seg_data["images"])
+            annotations.extend(seg_data["annotations"])
+        print(
+            "[INFO] Resuming {0} from image {1}..".format(split_name, state["cursor"])
+        )
+        return (
+            state["cursor"],
+            state["image_id"],
+            state["id1"],
+            state["num_segments"],
+            images,
+            annotations,
+        )
+
+    def convert_txt2coco(self, image_filelist, split_name=None):
         # Starting the JSON creation
         attrDict = dict()
         images = list()
@@ -64,9 +130,61 @@ class TXT2JSON:
         # 2. Creating the image and annotations
         image_id = 20200000000  # this number can start from anything (don't use 00000 because that becomes 0)
         id1 = 1
+        cursor = 0
+        num_segments = 0
+
+        # inner function for saving the state and the output produced since the last checkpoint
+        def _write_checkpoint(cursor):
+            nonlocal num_segments, seg_images, seg_annotations
+            segment = {
+                "images": images[seg_images:],
+                "annotations": annotations[seg_annotations:],
+            }
+            _atomic_write_(
+                self._checkpoint_file(split_name, num_segments), json.dumps(segment)
+            )
+            num_segments += 1
+            seg_images, seg_annotations = len(images), len(annotations)
+            state = {
+                "fingerprint": fingerprint,
+                "cursor": cursor,
+                "image_id": image_id,
+                "id1": id1,
+                "num_segments": num_segments,
+            }
+            _atomic_write_(self._checkpoint_file(split_name), json.dumps(state))
+
+        if split_name is not None:
+            # the checkpoint is only valid for the same image list and categories
+            fingerprint = hashlib.sha1(
+                json.dumps([attrDict["categories"], image_filelist]).encode("utf-8")
+            ).hexdigest()
+            checkpoint = None
+            if self.resume:
+                checkpoint = self._load_checkpoint(split_name, fingerprint)
+            if checkpoint is None:
+                self._remove_checkpoint(split_name)
+            else:
+                cursor, image_id, id1, num_segments, images, annotations = checkpoint
+        seg_images, seg_annotations = len(images), len(annotations)
+        checkpointing = split_name is not None and self.checkpoint_interval is not None
+
         for i, image_file in zip(
-            tqdm(range(len(image_filelist)), ncols=100), image_filelist
+            tqdm(
+                range(cursor, len(image_filelist)),
+                initial=cursor,
+                total=len(image_filelist),
+                ncols=100,
+            ),
+            image_filelist[cursor:],
         ):
+            if (
+                checkpointing
+                and i > cursor
+                and (i - cursor) % self.checkpoint_interval == 0
+            ):
+                _write_checkpoint(i)
+
             annotation_file = _check_annotation_(self.root_dir, image_file)
             if annotation_file is None:
                 continue
@@ -77,6 +195,8 @@ class TXT2JSON:
                     img = cv2.imread(
                         image_file, cv2.IMREAD_ANYCOLOR + cv2.IMREAD_ANYDEPTH
                     )
+                    if img is None:
+                        raise IOError("unable to read {0}".format(image_file))
                     height, width = (img.shape[0], img.shape[1])
                 except IOError as error:
                     print("IO ERROR: {0}".format(error))
@@ -134,6 +254,8 @@ class TXT2JSON:
 
                             annotations.append(annotation)
                             break
+        if checkpointing:
+            _write_checkpoint(len(image_filelist))
         attrDict["images"] = images
         attrDict["annotations"] = annotations
         attrDict["type"] = "instances"
@@ -148,8 +270,7 @@ class TXT2JSON:
         # inner function for writing the JSON twice
         def _write_json_file(json_string, json_filename):
             output_json_file = os.path.join(self.output_dir, json_filename)
-            with open(output_json_file, "w") as json_file_obj:
-                json_file_obj.write(json_string)
+            _atomic_write_(output_json_file, json_string)
             print("[INFO] - JSON file write completed..")
 
         image_filelist = sorted(
@@ -168,11 +289,15 @@ class TXT2JSON:
         train_list = image_filelist[:ratio]
         test_list = image_filelist[ratio:]
 
-        train_json_str = self.convert_txt2coco(train_list)
+        train_json_str = self.convert_txt2coco(train_list, "train2020")
         _write_json_file(train_json_str, "instances_train2020.json")
 
-        test_json_str = self.convert_txt2coco(test_list)
+        test_json_str = self.convert_txt2coco(test_list, "test2020")
         _write_json_file(test_json_str, "instances_test2020.json")
 
+        # both JSONs are written so the checkpoints are no longer needed
+        self._remove_checkpoint("train2020")
+        self._remove_checkpoint("test2020")
+
         print('[INFO] JSON creation complete...')
         return
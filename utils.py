@@ -42,6 +42,16 @@ def _check_annotation_(root_dir, image_file):
         return None
 
 
+def _atomic_write_(filename, data_string):
+    # write to a temporary file first and swap it in, so a crash never leaves a half written file
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w") as file_obj:
+        file_obj.write(data_string)
+        file_obj.flush()
+        os.fsync(file_obj.fileno())
+    os.replace(tmp_filename, filename)
+
+
 def _conv_xml_files(root_dir):
     xml_filelist = sorted(
         [